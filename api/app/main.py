@@ -1,25 +1,30 @@
 from __future__ import annotations
 
+import functools
 import hashlib
-import json
-import math
 import os
+import struct
+import threading
 import time
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
 
-from fastapi import FastAPI, HTTPException
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.responses import PlainTextResponse
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from .metrics import (
-    jobs_submitted_total,
-    jobs_completed_total,
-    job_end_to_end_ms,
-    job_compute_ms,
+    submitted_child,
+    completed_child,
+    end_to_end_child,
+    compute_child,
     jobs_in_memory,
+    observe_pair,
 )
 from .redis_backend import RedisJobBackend
 from .schemas import (
+    GemmSpec,
     SubmitJobRequest,
     SubmitJobResponse,
     JobStatusResponse,
@@ -30,50 +35,151 @@ from .store import InMemoryJobStore
 
 app = FastAPI(title="GPU Tile Math Service (Feature 1: API-only)")
 store = InMemoryJobStore()
+# runs in-memory jobs off the request thread (NumPy/BLAS release the GIL).
+# Kept small because each matmul is itself multithreaded by BLAS; raise
+# JOB_WORKERS together with a lower OMP/OPENBLAS_NUM_THREADS if needed.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+_EXEC = ThreadPoolExecutor(max_workers=JOB_WORKERS)
 
+# read once at import; /v1/backend reports these as-is
 JOB_BACKEND = os.getenv("JOB_BACKEND", "inmemory").lower()
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_STREAM = os.getenv("REDIS_STREAM")
 redis_backend = RedisJobBackend() if JOB_BACKEND == "redis" else None
 
-def _deterministic_checksum(payload: Dict[str, Any]) -> str:
-    b = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(b).hexdigest()
-
-
-def _cpu_gemm_summary(m: int, n: int, k: int, seed: int, repeats: int) -> Dict[str, Any]:
-    # Tiny CPU GEMM to validate pipeline. Not optimized.
+# canonical binary layout of the spec fields that define a job's result.
+# The shape-level prefix (op, m, n, k, dtype id, simulate) repeats across a
+# benchmark run, so its SHA-256 state is cached and only seed/repeats are fed per job.
+_SPEC_PREFIX = struct.Struct("<8sIIIB?")
+_SPEC_TAIL = struct.Struct("<II")
+DTYPE_ID = {"fp16": 0, "fp32": 1}
+
+_PREFIX_HASHER_CACHE_MAX = 1024
+_prefix_hasher_cache: Dict[Tuple[Any, ...], hashlib._Hash] = {}
+
+
+def _prefix_hasher(key: Tuple[Any, ...]) -> hashlib._Hash:
+    h = _prefix_hasher_cache.get(key)
+    if h is None:
+        if len(_prefix_hasher_cache) >= _PREFIX_HASHER_CACHE_MAX:
+            _prefix_hasher_cache.clear()
+        op, m, n, k, dtype, simulate = key
+        h = hashlib.sha256(_SPEC_PREFIX.pack(op.encode(), m, n, k, DTYPE_ID[dtype], simulate))
+        _prefix_hasher_cache[key] = h
+    return h
+
+
+def _fast_spec_checksum(key: Tuple[Any, ...], seed: int, repeats: int, tail: bytes = b"") -> str:
+    # key is the shape prefix: (op, m, n, k, dtype, simulate)
+    h = _prefix_hasher(key).copy()
+    h.update(_SPEC_TAIL.pack(seed, repeats))
+    h.update(tail)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def _xorshift_matrix(seed: int, offset: int, rows: int, cols: int) -> np.ndarray:
+    # deterministic xorshift-ish fill, vectorized in uint32 (wraps like the & 0xFFFFFFFF masks).
+    # Cached per (seed, shape) and read-only, so concurrent jobs can share it.
+    i = np.arange(offset, offset + rows * cols, dtype=np.uint32)
+    x = np.uint32(seed) ^ (i * np.uint32(0x9E3779B9))
+    x ^= x << np.uint32(13)
+    x ^= x >> np.uint32(17)
+    x ^= x << np.uint32(5)
+    out = ((x / 0xFFFFFFFF) - 0.5).astype(np.float32).reshape(rows, cols)
+    out.setflags(write=False)
+    return out
+
+
+_SCRATCH_MAX_SHAPES = 8
+_scratch = threading.local()
+
+
+def _scratch_buffer(name: str, shape: Tuple[int, int]) -> np.ndarray:
+    # per-thread working buffers keyed by (name, shape); executor threads never share one
+    bufs = getattr(_scratch, "bufs", None)
+    if bufs is None:
+        bufs = _scratch.bufs = {}
+    key = (name, shape)
+    buf = bufs.get(key)
+    if buf is None:
+        if len(bufs) >= _SCRATCH_MAX_SHAPES:
+            bufs.clear()
+        buf = bufs[key] = np.empty(shape, dtype=np.float32)
+    return buf
+
+
+_DEFAULT_TILE = 32
+# each tile step is a Python-level matmul call; bound the total per job
+_MAX_TILE_CALLS = 20_000
+
+
+def _gemm_kernel(
+    A: np.ndarray,
+    B: np.ndarray,
+    C: np.ndarray,
+    repeats: int,
+    tile: Tuple[int, int, int] | None = None,
+) -> None:
+    if tile is None:
+        # BLAS sgemm is already SIMD + multithreaded and blocks for cache itself
+        for _ in range(repeats):
+            np.matmul(A, B, out=C)
+        return
+
+    # explicit (TM, TN, TK) blocking: each C tile accumulates over K panels of A/B
+    tm, tn, tk = tile
+    M, K = A.shape
+    N = B.shape[1]
+    partial = _scratch_buffer("partial", (min(tm, M), min(tn, N)))
+    for _ in range(repeats):
+        for i0 in range(0, M, tm):
+            for j0 in range(0, N, tn):
+                c = C[i0:i0 + tm, j0:j0 + tn]
+                p = partial[: c.shape[0], : c.shape[1]]
+                c.fill(0.0)
+                for k0 in range(0, K, tk):
+                    np.matmul(A[i0:i0 + tm, k0:k0 + tk], B[k0:k0 + tk, j0:j0 + tn], out=p)
+                    c += p
+
+
+# warm the BLAS backend so the first request doesn't pay its thread-pool startup
+_gemm_kernel(np.ones((2, 2), np.float32), np.ones((2, 2), np.float32), np.empty((2, 2), np.float32), 1)
+
+
+def _cpu_gemm_summary(
+    m: int,
+    n: int,
+    k: int,
+    seed: int,
+    repeats: int,
+    tile: Tuple[int, int, int] | None = None,
+) -> Dict[str, Any]:
+    # Tiny CPU GEMM to validate pipeline.
     # Hard cap to keep API responsive.
     max_elems = 128 * 128
     if m * n > max_elems or m * k > max_elems or k * n > max_elems:
         raise ValueError("Shape too large for CPU compute mode; set simulate=true.")
+    if tile is not None:
+        tm, tn, tk = tile
+        calls = -(-m // tm) * -(-n // tn) * -(-k // tk) * repeats
+        if calls > _MAX_TILE_CALLS:
+            raise ValueError(
+                f"Tiling {tm}x{tn}x{tk} needs {calls} block matmuls (limit {_MAX_TILE_CALLS}); "
+                "use larger tiles, fewer repeats, or omit tile_* fields."
+            )
 
-    # simple deterministic pseudo-random matrix generation (no numpy dependency)
-    def rand(i: int) -> float:
-        # xorshift-ish
-        x = (seed ^ (i * 0x9E3779B9)) & 0xFFFFFFFF
-        x ^= (x << 13) & 0xFFFFFFFF
-        x ^= (x >> 17) & 0xFFFFFFFF
-        x ^= (x << 5) & 0xFFFFFFFF
-        return (x / 0xFFFFFFFF) - 0.5
-
-    A = [rand(i) for i in range(m * k)]
-    B = [rand(10_000_000 + i) for i in range(k * n)]
+    A = _xorshift_matrix(seed, 0, m, k)
+    B = _xorshift_matrix(seed, 10_000_000, k, n)
 
-    C = [0.0 for _ in range(m * n)]
+    C = _scratch_buffer("C", (m, n))
+    _gemm_kernel(A, B, C, repeats, tile)
 
-    for _ in range(repeats):
-        for i in range(m):
-            for j in range(n):
-                s = 0.0
-                row = i * k
-                col = j
-                for kk in range(k):
-                    s += A[row + kk] * B[kk * n + col]
-                C[i * n + j] = s
-
-    mean = sum(C) / (m * n)
-    var = sum((x - mean) * (x - mean) for x in C) / (m * n)
-    l2 = math.sqrt(sum(x * x for x in C))
-    checksum = _deterministic_checksum({"m": m, "n": n, "k": k, "seed": seed, "repeats": repeats, "mean": mean, "var": var, "l2": l2})
+    mean = float(C.mean())
+    var = float(C.var())
+    l2 = float(np.linalg.norm(C))
+    # CPU mode always computes in fp32
+    checksum = _fast_spec_checksum(("gemm", m, n, k, "fp32", False), seed, repeats, struct.pack("<3d", mean, var, l2))
     return {"mean": mean, "var": var, "l2": l2, "checksum": checksum, "mode": "cpu_gemm"}
 
 
@@ -84,44 +190,22 @@ def healthz() -> Dict[str, str]:
 
 @app.get("/metrics")
 def metrics() -> PlainTextResponse:
-    try:
-        # private access is fine in-process
-        jobs_in_memory.set(len(store._jobs))
-    except Exception:
-        pass
+    jobs_in_memory.set(len(store))
     return PlainTextResponse(generate_latest().decode("utf-8"), media_type=CONTENT_TYPE_LATEST)
 
 
-@app.post("/v1/jobs", response_model=SubmitJobResponse)
-def submit_job(req: SubmitJobRequest) -> SubmitJobResponse:
-    spec = req.spec.model_dump()
-
-    # metrics: submitted
-    jobs_submitted_total.labels(
-        op=spec["op"],
-        dtype=spec["dtype"],
-        simulate=str(spec["simulate"]).lower(),
-    ).inc()
-
-    if redis_backend is not None:
-        job_id = redis_backend.create_job(spec)
-        redis_backend.enqueue(job_id, spec)
-        jobs_submitted_total.labels(
-            op=spec["op"],
-            dtype=spec["dtype"],
-            simulate=str(spec["simulate"]).lower(),
-        ).inc()
-        return SubmitJobResponse(job_id=job_id)
+# "simulate" label values
+_SIM_STR = {True: "true", False: "false"}
 
-    job_id = store.create_job(spec)
 
-    t0 = time.perf_counter()
-    store.set_state(job_id, JobState.RUNNING)
+def _run_job_sync(job_id: str, g: GemmSpec, t0: float) -> None:
+    op, dtype, sim = g.op, g.dtype.value, _SIM_STR[g.simulate]
 
     try:
+        store.set_state(job_id, JobState.RUNNING)
         c0 = time.perf_counter()
-        if spec["simulate"]:
-            checksum = _deterministic_checksum(spec)
+        if g.simulate:
+            checksum = _fast_spec_checksum((op, g.m, g.n, g.k, dtype, g.simulate), g.seed, g.repeats)
             result = {
                 "checksum": checksum,
                 "mode": "simulated",
@@ -129,12 +213,16 @@ def submit_job(req: SubmitJobRequest) -> SubmitJobResponse:
             }
             compute_ms = (time.perf_counter() - c0) * 1000.0
         else:
+            tile = None
+            if g.tile_m or g.tile_n or g.tile_k:
+                tile = (g.tile_m or _DEFAULT_TILE, g.tile_n or _DEFAULT_TILE, g.tile_k or _DEFAULT_TILE)
             result = _cpu_gemm_summary(
-                m=int(spec["m"]),
-                n=int(spec["n"]),
-                k=int(spec["k"]),
-                seed=int(spec["seed"]),
-                repeats=int(spec["repeats"]),
+                m=g.m,
+                n=g.n,
+                k=g.k,
+                seed=g.seed,
+                repeats=g.repeats,
+                tile=tile,
             )
             compute_ms = (time.perf_counter() - c0) * 1000.0
 
@@ -142,16 +230,35 @@ def submit_job(req: SubmitJobRequest) -> SubmitJobResponse:
         store.set_result(job_id, result_summary=result, wall_time_ms=wall_ms, compute_time_ms=compute_ms)
         store.set_state(job_id, JobState.DONE)
 
-        jobs_completed_total.labels(op=spec["op"], dtype=spec["dtype"], state="done").inc()
-        job_end_to_end_ms.labels(op=spec["op"], dtype=spec["dtype"], simulate=str(spec["simulate"]).lower()).observe(wall_ms)
-        job_compute_ms.labels(op=spec["op"], dtype=spec["dtype"], simulate=str(spec["simulate"]).lower()).observe(compute_ms)
+        completed_child(op, dtype, "done").inc()
+        observe_pair(end_to_end_child(op, dtype, sim), wall_ms, compute_child(op, dtype, sim), compute_ms)
 
     except Exception as e:
         wall_ms = (time.perf_counter() - t0) * 1000.0
         store.set_result(job_id, result_summary=None, wall_time_ms=wall_ms, compute_time_ms=None)
         store.set_state(job_id, JobState.FAILED, error=str(e))
-        jobs_completed_total.labels(op=spec["op"], dtype=spec["dtype"], state="failed").inc()
+        completed_child(op, dtype, "failed").inc()
+
+
+@app.post("/v1/jobs", response_model=SubmitJobResponse)
+def submit_job(req: SubmitJobRequest) -> SubmitJobResponse:
+    g = req.spec
+    op, dtype, sim = g.op, g.dtype.value, _SIM_STR[g.simulate]
+
+    # metrics: submitted
+    submitted_child(op, dtype, sim).inc()
 
+    if redis_backend is not None:
+        # the queue payload is JSON, so only this path materializes a dict
+        spec = g.model_dump(mode="json")
+        job_id = redis_backend.create_job(spec)
+        redis_backend.enqueue(job_id, spec)
+        return SubmitJobResponse(job_id=job_id)
+
+    # in-memory mode: hand off to the executor and return right away
+    t0 = time.perf_counter()
+    job_id = store.create_job(g)
+    _EXEC.submit(_run_job_sync, job_id, g, t0)
     return SubmitJobResponse(job_id=job_id)
 
 
@@ -180,12 +287,16 @@ def get_job(job_id: str) -> JobStatusResponse:
     )
 
 @app.get("/v1/jobs/{job_id}/result", response_model=JobResultResponse)
-def get_result(job_id: str) -> JobResultResponse:
+def get_result(
+    job_id: str,
+    wait: float = Query(0.0, ge=0.0, le=30.0, description="Redis backend: seconds to block until the job is DONE/FAILED"),
+) -> JobResultResponse:
     if redis_backend is not None:
-        meta = redis_backend.get_meta(job_id)
+        if wait > 0:
+            redis_backend.wait_for_done(job_id, wait)
+        meta, result = redis_backend.get_meta_and_result(job_id)
         if meta is None:
             raise HTTPException(status_code=404, detail="job_id not found")
-        result = redis_backend.get_result(job_id)
         return JobResultResponse(
             job_id=job_id,
             state=meta["state"],
@@ -208,7 +319,7 @@ def get_result(job_id: str) -> JobResultResponse:
 def backend():
     return {
         "JOB_BACKEND": JOB_BACKEND,
-        "REDIS_URL": os.getenv("REDIS_URL"),
-        "REDIS_STREAM": os.getenv("REDIS_STREAM"),
+        "REDIS_URL": REDIS_URL,
+        "REDIS_STREAM": REDIS_STREAM,
         "redis_enabled": redis_backend is not None,
     }
\ No newline at end of file
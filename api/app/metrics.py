@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Tuple
+
 from prometheus_client import Counter, Histogram, Gauge
 
 jobs_submitted_total = Counter(
@@ -30,3 +33,35 @@ jobs_in_memory = Gauge(
     "jobs_in_memory",
     "Number of jobs currently tracked in memory",
 )
+
+
+def cached_labels(metric: Any) -> Callable[..., Any]:
+    """Return a lookup that memoizes metric.labels(*values) per label tuple."""
+    cache: Dict[Tuple[str, ...], Any] = {}
+
+    def child(*values: str) -> Any:
+        c = cache.get(values)
+        if c is None:
+            c = cache[values] = metric.labels(*values)
+        return c
+
+    return child
+
+
+submitted_child = cached_labels(jobs_submitted_total)  # (op, dtype, simulate)
+completed_child = cached_labels(jobs_completed_total)  # (op, dtype, state)
+end_to_end_child = cached_labels(job_end_to_end_ms)  # (op, dtype, simulate)
+compute_child = cached_labels(job_compute_ms)  # (op, dtype, simulate)
+
+
+def observe_pair(h1: Any, v1: float, h2: Any, v2: float) -> None:
+    """Observe two co-recorded histogram children in one call.
+
+    Same effect as h1.observe(v1); h2.observe(v2) without exemplars, but
+    finds each bucket by binary search over the upper bounds instead of
+    Histogram.observe's linear scan. Relies on prometheus_client's
+    _sum/_buckets/_upper_bounds; each value still updates under its own lock.
+    """
+    for h, v in ((h1, v1), (h2, v2)):
+        h._sum.inc(v)
+        h._buckets[bisect_left(h._upper_bounds, v)].inc(1)
@@ -1,29 +1,63 @@
 from __future__ import annotations
 
-import json
 import os
+import secrets
+import threading
 import time
-import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 import redis
 
 DEFAULT_STREAM = "queue:jobs"
 
+_REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+# shared across requests; bytes mode so replies are only decoded where we read them
+_POOL = redis.ConnectionPool.from_url(_REDIS_URL, max_connections=64)
+
+# ?wait= long-polls each hold a request thread and a pubsub connection, so they
+# get their own small budget: past _MAX_WAITERS a wait returns immediately, and
+# their connections (pubsub + state re-check per waiter) come from a separate
+# pool that blocks rather than raising when exhausted.
+_MAX_WAITERS = 8
+_WAIT_POOL = redis.BlockingConnectionPool.from_url(_REDIS_URL, max_connections=2 * _MAX_WAITERS, timeout=5)
+
+# meta hash fields read back by get_meta (spec_json is write-only from the API's side)
+_META_FIELDS = (
+    "state",
+    "created_at",
+    "updated_at",
+    "started_at",
+    "finished_at",
+    "error",
+    "wall_time_ms",
+    "compute_time_ms",
+)
+
+
+# upper bound on a single pubsub wait in wait_for_done
+_WAIT_RECHECK_SEC = 1.0
+
 
 def _r() -> redis.Redis:
-    url = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
-    return redis.Redis.from_url(url, decode_responses=True)
+    return redis.Redis(connection_pool=_POOL)
+
+
+def _spec_json(spec: Dict[str, Any]) -> bytes:
+    return orjson.dumps(spec, option=orjson.OPT_SORT_KEYS)
 
 
 class RedisJobBackend:
     def __init__(self) -> None:
         self.r = _r()
+        self.r_wait = redis.Redis(connection_pool=_WAIT_POOL)
         self.stream = os.getenv("REDIS_STREAM", DEFAULT_STREAM)
+        self._wait_slots = threading.BoundedSemaphore(_MAX_WAITERS)
 
     def create_job(self, spec: Dict[str, Any]) -> str:
-        job_id = uuid.uuid4().hex
-        now = time.time()
+        job_id = secrets.token_hex(16)
+        now = str(time.time())
         meta_key = f"job:{job_id}:meta"
 
         self.r.hset(
@@ -31,51 +65,103 @@ class RedisJobBackend:
             mapping={
                 "job_id": job_id,
                 "state": "QUEUED",
-                "created_at": str(now),
-                "updated_at": str(now),
+                "created_at": now,
+                "updated_at": now,
                 "started_at": "",
                 "finished_at": "",
                 "error": "",
                 "wall_time_ms": "",
                 "compute_time_ms": "",
-                "spec_json": json.dumps(spec, sort_keys=True, separators=(",", ":")),
+                "spec_json": _spec_json(spec),
             },
         )
         return job_id
 
     def enqueue(self, job_id: str, spec: Dict[str, Any]) -> str:
-        return self.r.xadd(
+        msg_id = self.r.xadd(
             self.stream,
             {
                 "job_id": job_id,
-                "spec_json": json.dumps(spec, sort_keys=True, separators=(",", ":")),
+                "spec_json": _spec_json(spec),
             },
         )
+        return msg_id.decode()
 
     def get_meta(self, job_id: str) -> Optional[Dict[str, Any]]:
-        meta_key = f"job:{job_id}:meta"
-        m = self.r.hgetall(meta_key)
-        if not m:
-            return None
-
-        def ffloat(k: str) -> float | None:
-            v = m.get(k, "")
-            return float(v) if v not in ("", None) else None
-
-        return {
-            "job_id": job_id,
-            "state": m.get("state", "QUEUED"),
-            "created_at": float(m.get("created_at", "0") or "0"),
-            "updated_at": float(m.get("updated_at", "0") or "0"),
-            "started_at": ffloat("started_at"),
-            "finished_at": ffloat("finished_at"),
-            "error": (m.get("error") or None),
-            "wall_time_ms": ffloat("wall_time_ms"),
-            "compute_time_ms": ffloat("compute_time_ms"),
-        }
+        return _parse_meta(job_id, self.r.hmget(f"job:{job_id}:meta", _META_FIELDS))
 
     def get_result(self, job_id: str) -> Dict[str, Any] | None:
-        s = self.r.get(f"job:{job_id}:result")
-        if not s:
-            return None
-        return json.loads(s)
+        return _parse_result(self.r.get(f"job:{job_id}:result"))
+
+    def get_meta_and_result(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any] | None]:
+        # one round-trip for both keys
+        pipe = self.r.pipeline(transaction=False)
+        pipe.hmget(f"job:{job_id}:meta", _META_FIELDS)
+        pipe.get(f"job:{job_id}:result")
+        m, s = pipe.execute()
+        return _parse_meta(job_id, m), _parse_result(s)
+
+    def wait_for_done(self, job_id: str, timeout: float) -> bool:
+        """Block until the job is DONE/FAILED (or unknown) or timeout elapses.
+
+        Wakes on keyspace notifications for the meta hash, which requires
+        `notify-keyspace-events Kh` on the Redis server. Without it this
+        degrades to re-checking the state every _WAIT_RECHECK_SEC.
+
+        Returns False without waiting when _MAX_WAITERS waits are already in
+        flight; the caller then just reports the current state.
+        """
+        if not self._wait_slots.acquire(blocking=False):
+            return False
+        try:
+            self._wait(job_id, timeout)
+        finally:
+            self._wait_slots.release()
+        return True
+
+    def _wait(self, job_id: str, timeout: float) -> None:
+        meta_key = f"job:{job_id}:meta"
+        db = self.r_wait.connection_pool.connection_kwargs.get("db", 0)
+        deadline = time.monotonic() + timeout
+        pubsub = self.r_wait.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(f"__keyspace@{db}__:{meta_key}")
+            # check after subscribing so a transition in between isn't missed
+            while True:
+                state = self.r_wait.hget(meta_key, "state")
+                if state is None or state in (b"DONE", b"FAILED"):
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                pubsub.get_message(timeout=min(remaining, _WAIT_RECHECK_SEC))
+        finally:
+            pubsub.close()
+
+
+def _parse_meta(job_id: str, values: List[Optional[bytes]]) -> Optional[Dict[str, Any]]:
+    m = dict(zip(_META_FIELDS, values))
+    if m["created_at"] is None:
+        return None
+
+    def ffloat(k: str) -> float | None:
+        v = m[k]
+        return float(v) if v else None
+
+    return {
+        "job_id": job_id,
+        "state": (m["state"] or b"QUEUED").decode(),
+        "created_at": float(m["created_at"] or 0),
+        "updated_at": float(m["updated_at"] or 0),
+        "started_at": ffloat("started_at"),
+        "finished_at": ffloat("finished_at"),
+        "error": (m["error"] or b"").decode() or None,
+        "wall_time_ms": ffloat("wall_time_ms"),
+        "compute_time_ms": ffloat("compute_time_ms"),
+    }
+
+
+def _parse_result(s: bytes | None) -> Dict[str, Any] | None:
+    if not s:
+        return None
+    return orjson.loads(s)
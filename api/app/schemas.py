@@ -36,7 +36,7 @@ class GemmSpec(BaseModel):
         description="If true, don't compute; return deterministic checksum + timing metadata.",
     )
 
-    # Future: let the client request a tile configuration explicitly
+    # Optional tile configuration; CPU mode blocks the GEMM by these (missing ones default to 32)
     tile_m: Optional[conint(ge=1, le=256)] = None
     tile_n: Optional[conint(ge=1, le=256)] = None
     tile_k: Optional[conint(ge=1, le=256)] = None
@@ -1,17 +1,17 @@
 from __future__ import annotations
 
+import secrets
 import threading
 import time
-import uuid
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from .schemas import JobState
+from .schemas import GemmSpec, JobState
 
 
-@dataclass
+@dataclass(slots=True)
 class JobRecord:
-    spec: Dict[str, Any]
+    spec: GemmSpec
     state: JobState
     created_at: float
     updated_at: float
@@ -23,27 +23,42 @@ class JobRecord:
     compute_time_ms: Optional[float] = None
 
 
+_N_SHARDS = 16  # power of two so the shard index is a mask
+
+
 class InMemoryJobStore:
     def __init__(self) -> None:
-        self._lock = threading.RLock()
-        self._jobs: Dict[str, JobRecord] = {}
+        # jobs are spread over shards by id hash so unrelated jobs don't share a lock
+        self._shards: List[Dict[str, JobRecord]] = [{} for _ in range(_N_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(_N_SHARDS)]
+
+    def _shard(self, job_id: str) -> Tuple[Dict[str, JobRecord], threading.Lock]:
+        i = hash(job_id) & (_N_SHARDS - 1)
+        return self._shards[i], self._locks[i]
+
+    def __len__(self) -> int:
+        # unlocked, approximate under concurrent writes
+        return sum(len(s) for s in self._shards)
 
-    def create_job(self, spec: Dict[str, Any]) -> str:
-        job_id = uuid.uuid4().hex
+    def create_job(self, spec: GemmSpec) -> str:
+        job_id = secrets.token_hex(16)
         now = time.time()
         rec = JobRecord(spec=spec, state=JobState.QUEUED, created_at=now, updated_at=now)
-        with self._lock:
-            self._jobs[job_id] = rec
+        jobs, lock = self._shard(job_id)
+        with lock:
+            jobs[job_id] = rec
         return job_id
 
     def get(self, job_id: str) -> JobRecord | None:
-        with self._lock:
-            return self._jobs.get(job_id)
+        jobs, lock = self._shard(job_id)
+        with lock:
+            return jobs.get(job_id)
 
     def set_state(self, job_id: str, state: JobState, *, error: str | None = None) -> None:
         now = time.time()
-        with self._lock:
-            rec = self._jobs[job_id]
+        jobs, lock = self._shard(job_id)
+        with lock:
+            rec = jobs[job_id]
             rec.state = state
             rec.updated_at = now
             if error is not None:
@@ -62,8 +77,9 @@ class InMemoryJobStore:
         compute_time_ms: float | None,
     ) -> None:
         now = time.time()
-        with self._lock:
-            rec = self._jobs[job_id]
+        jobs, lock = self._shard(job_id)
+        with lock:
+            rec = jobs[job_id]
             rec.updated_at = now
             rec.result_summary = result_summary
             rec.wall_time_ms = wall_time_ms
@@ -1,13 +1,26 @@
+import time
+
 from fastapi.testclient import TestClient
 from app.main import app
 
 client = TestClient(app)
 
 
+def wait_done(job_id, timeout=5.0):
+    # in-memory jobs run on a background executor; poll until they settle
+    deadline = time.monotonic() + timeout
+    while True:
+        state = client.get(f"/v1/jobs/{job_id}").json()["state"]
+        if state in ("DONE", "FAILED") or time.monotonic() > deadline:
+            return state
+        time.sleep(0.01)
+
+
 def test_submit_and_get_simulated_job():
     r = client.post("/v1/jobs", json={"spec": {"op": "gemm", "m": 4096, "n": 4096, "k": 4096, "dtype": "fp16", "repeats": 1, "seed": 1, "simulate": True}})
     assert r.status_code == 200
     job_id = r.json()["job_id"]
+    wait_done(job_id)
 
     s = client.get(f"/v1/jobs/{job_id}")
     assert s.status_code == 200
@@ -26,9 +39,70 @@ def test_small_cpu_job():
     r = client.post("/v1/jobs", json={"spec": {"op": "gemm", "m": 16, "n": 16, "k": 16, "dtype": "fp32", "repeats": 2, "seed": 7, "simulate": False}})
     assert r.status_code == 200
     job_id = r.json()["job_id"]
+    assert wait_done(job_id) == "DONE"
 
     out = client.get(f"/v1/jobs/{job_id}/result")
     assert out.status_code == 200
     js = out.json()
     assert js["state"] == "DONE"
     assert js["result_summary"]["mode"] == "cpu_gemm"
+
+
+def test_cpu_job_is_deterministic():
+    spec = {"op": "gemm", "m": 8, "n": 12, "k": 4, "dtype": "fp32", "repeats": 1, "seed": 3, "simulate": False}
+    sums = []
+    for _ in range(2):
+        job_id = client.post("/v1/jobs", json={"spec": spec}).json()["job_id"]
+        wait_done(job_id)
+        sums.append(client.get(f"/v1/jobs/{job_id}/result").json()["result_summary"])
+    assert sums[0]["checksum"] == sums[1]["checksum"]
+    assert sums[0]["l2"] > 0
+
+
+def test_simulated_checksum_depends_on_spec():
+    def checksum(seed):
+        spec = {"op": "gemm", "m": 4096, "n": 4096, "k": 4096, "dtype": "fp16", "repeats": 1, "seed": seed, "simulate": True}
+        job_id = client.post("/v1/jobs", json={"spec": spec}).json()["job_id"]
+        wait_done(job_id)
+        return client.get(f"/v1/jobs/{job_id}/result").json()["result_summary"]["checksum"]
+
+    assert checksum(1) == checksum(1)
+    assert checksum(1) != checksum(2)
+
+
+def test_tiled_cpu_job_matches_untiled():
+    base = {"op": "gemm", "m": 40, "n": 24, "k": 36, "dtype": "fp32", "repeats": 1, "seed": 5, "simulate": False}
+    sums = []
+    for tiles in ({}, {"tile_m": 16, "tile_n": 8}, {"tile_m": 7, "tile_n": 5, "tile_k": 11}):
+        job_id = client.post("/v1/jobs", json={"spec": {**base, **tiles}}).json()["job_id"]
+        assert wait_done(job_id) == "DONE"
+        sums.append(client.get(f"/v1/jobs/{job_id}/result").json()["result_summary"])
+    for s in sums[1:]:
+        assert abs(s["l2"] - sums[0]["l2"]) < 1e-3 * sums[0]["l2"]
+        assert abs(s["mean"] - sums[0]["mean"]) < 1e-4
+
+
+def test_tiled_cpu_job_rejects_excessive_block_count():
+    spec = {"op": "gemm", "m": 128, "n": 128, "k": 128, "dtype": "fp32", "repeats": 10, "seed": 1, "simulate": False,
+            "tile_m": 1, "tile_n": 1, "tile_k": 1}
+    job_id = client.post("/v1/jobs", json={"spec": spec}).json()["job_id"]
+    assert wait_done(job_id) == "FAILED"
+    out = client.get(f"/v1/jobs/{job_id}/result").json()
+    assert "block matmuls" in out["error"]
+
+
+def test_job_fails_instead_of_sticking_when_running_transition_raises(monkeypatch):
+    from app import main
+
+    real_set_state = main.store.set_state
+
+    def set_state(job_id, state, **kw):
+        if state == "RUNNING":
+            raise RuntimeError("boom")
+        return real_set_state(job_id, state, **kw)
+
+    monkeypatch.setattr(main.store, "set_state", set_state)
+    spec = {"op": "gemm", "m": 4, "n": 4, "k": 4, "dtype": "fp32", "repeats": 1, "seed": 0, "simulate": True}
+    job_id = client.post("/v1/jobs", json={"spec": spec}).json()["job_id"]
+    assert wait_done(job_id) == "FAILED"
+    assert client.get(f"/v1/jobs/{job_id}/result").json()["error"] == "boom"
@@ -0,0 +1,23 @@
+from prometheus_client import CollectorRegistry, Histogram, generate_latest
+
+from app.metrics import observe_pair
+
+
+def test_observe_pair_matches_observe():
+    values = [(0.0, 0.004), (0.005, 0.3), (7.5, 10.0), (42.0, 1e9)]
+
+    reg_a, reg_b = CollectorRegistry(), CollectorRegistry()
+    a1 = Histogram("a1", "h", ["op"], registry=reg_a).labels("gemm")
+    a2 = Histogram("a2", "h", ["op"], registry=reg_a).labels("gemm")
+    b1 = Histogram("a1", "h", ["op"], registry=reg_b).labels("gemm")
+    b2 = Histogram("a2", "h", ["op"], registry=reg_b).labels("gemm")
+
+    for v1, v2 in values:
+        a1.observe(v1)
+        a2.observe(v2)
+        observe_pair(b1, v1, b2, v2)
+
+    def samples(reg):
+        return [line for line in generate_latest(reg).decode().splitlines() if "_created" not in line]
+
+    assert samples(reg_a) == samples(reg_b)
@@ -0,0 +1,82 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.redis_backend import RedisJobBackend, _MAX_WAITERS
+
+
+class FakePubSub:
+    def __init__(self, changed):
+        self.changed = changed
+
+    def subscribe(self, channel):
+        self.channel = channel
+
+    def get_message(self, timeout):
+        if self.changed.wait(timeout):
+            self.changed.clear()
+            return {"type": "message", "data": b"hset"}
+        return None
+
+    def close(self):
+        pass
+
+
+class FakeRedis:
+    """Just enough of redis.Redis for wait_for_done: HGET + keyspace pubsub."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.changed = threading.Event()
+        self.connection_pool = SimpleNamespace(connection_kwargs={"db": 0})
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+        self.changed.set()
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self.changed)
+
+
+def make_backend():
+    b = RedisJobBackend()
+    b.r_wait = FakeRedis()
+    b.get_meta_and_result = lambda job_id: (
+        {"job_id": job_id, "state": b.r_wait.hget(f"job:{job_id}:meta", "state").decode(), "error": None},
+        {"mode": "fake"},
+    )
+    return b
+
+
+def test_result_wait_returns_once_job_is_done(monkeypatch):
+    b = make_backend()
+    b.r_wait.hset("job:j1:meta", "state", b"QUEUED")
+    monkeypatch.setattr(main, "redis_backend", b)
+
+    timer = threading.Timer(0.2, b.r_wait.hset, ("job:j1:meta", "state", b"DONE"))
+    timer.start()
+    t0 = time.monotonic()
+    out = TestClient(main.app).get("/v1/jobs/j1/result", params={"wait": 10})
+    elapsed = time.monotonic() - t0
+    timer.join()
+
+    assert out.status_code == 200
+    assert out.json()["state"] == "DONE"
+    assert 0.15 <= elapsed < 5
+
+
+def test_wait_returns_immediately_when_waiters_exhausted():
+    b = make_backend()
+    b.r_wait.hset("job:j2:meta", "state", b"QUEUED")
+    for _ in range(_MAX_WAITERS):
+        b._wait_slots.acquire()
+
+    t0 = time.monotonic()
+    assert b.wait_for_done("j2", 10) is False
+    assert time.monotonic() - t0 < 1
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import argparse
 import math
-import re
 import sys
 import time
 from collections import defaultdict
@@ -9,8 +8,9 @@ from dataclasses import dataclass
 from typing import Dict, List, Tuple
 from urllib.request import urlopen
 
+import numpy as np
+from prometheus_client.parser import text_string_to_metric_families
 
-SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)$')
 
 def fetch_metrics(host: str) -> str:
     url = host.rstrip("/") + "/metrics"
@@ -18,53 +18,11 @@ def fetch_metrics(host: str) -> str:
         return resp.read().decode("utf-8", errors="replace")
 
 
-def parse_labels(label_blob: str) -> Dict[str, str]:
-    # label_blob like {a="b",le="0.5"}
-    if not label_blob:
-        return {}
-    s = label_blob.strip()
-    if s[0] == "{":
-        s = s[1:-1]
-    labels = {}
-    if not s.strip():
-        return labels
-    # split on commas that are not inside quotes (simple enough for our labels)
-    parts = []
-    cur, in_q = [], False
-    for ch in s:
-        if ch == '"':
-            in_q = not in_q
-        if ch == "," and not in_q:
-            parts.append("".join(cur))
-            cur = []
-        else:
-            cur.append(ch)
-    parts.append("".join(cur))
-
-    for p in parts:
-        if "=" not in p:
-            continue
-        k, v = p.split("=", 1)
-        k = k.strip()
-        v = v.strip()
-        if v.startswith('"') and v.endswith('"'):
-            v = v[1:-1]
-        labels[k] = v
-    return labels
-
-
 def parse_exposition(text: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
     series = defaultdict(list)
-    for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        m = SAMPLE_RE.match(line)
-        if not m:
-            continue
-        name, label_blob, val = m.group(1), m.group(2), m.group(3)
-        labels = parse_labels(label_blob or "")
-        series[name].append((labels, float(val)))
+    for fam in text_string_to_metric_families(text):
+        for s in fam.samples:
+            series[s.name].append((s.labels, s.value))
     return series
 
 
@@ -80,6 +38,8 @@ class HistAgg:
     inf_count: float
     sum: float
     count: float
+    le_arr: np.ndarray  # bucket upper bounds, ascending
+    cum_arr: np.ndarray  # cumulative counts aligned with le_arr
 
 
 def group_histograms(series: Dict[str, List[Tuple[Dict[str, str], float]]], base: str) -> Dict[HistKey, HistAgg]:
@@ -120,23 +80,27 @@ def group_histograms(series: Dict[str, List[Tuple[Dict[str, str], float]]], base
     out = {}
     keys = set(sums.keys()) | set(counts.keys()) | set(buckets.keys()) | set(inf_counts.keys())
     for k in keys:
+        b = dict(sorted(buckets.get(k, {}).items(), key=lambda x: x[0]))
         out[k] = HistAgg(
-            buckets=dict(sorted(buckets.get(k, {}).items(), key=lambda x: x[0])),
+            buckets=b,
             inf_count=inf_counts.get(k, 0.0),
             sum=sums.get(k, 0.0),
             count=counts.get(k, 0.0),
+            le_arr=np.fromiter(b.keys(), dtype=np.float64, count=len(b)),
+            cum_arr=np.fromiter(b.values(), dtype=np.float64, count=len(b)),
         )
     return out
 
 
-def quantile_from_buckets(buckets: Dict[float, float], total: float, q: float) -> float:
-    if total <= 0:
-        return float("nan")
-    target = q * total
-    for le, c in buckets.items():
-        if c >= target:
-            return le
-    return float("inf")
+def quantiles_from_buckets(agg: HistAgg, qs: List[float]) -> List[float]:
+    # first bucket whose cumulative count reaches q * total, for all qs at once
+    if agg.count <= 0:
+        return [float("nan")] * len(qs)
+    n = len(agg.le_arr)
+    if n == 0:
+        return [float("inf")] * len(qs)
+    idx = np.searchsorted(agg.cum_arr, np.asarray(qs) * agg.count, side="left")
+    return np.where(idx < n, agg.le_arr[np.minimum(idx, n - 1)], np.inf).tolist()
 
 
 def fmt_ms(x: float) -> str:
@@ -228,9 +192,7 @@ def render_dashboard(host: str) -> None:
             sim = label_get(k.labels, "simulate")
             count = agg.count
             avg = (agg.sum / count) if count > 0 else float("nan")
-            p50 = quantile_from_buckets(agg.buckets, count, 0.50)
-            p95 = quantile_from_buckets(agg.buckets, count, 0.95)
-            p99 = quantile_from_buckets(agg.buckets, count, 0.99)
+            p50, p95, p99 = quantiles_from_buckets(agg, [0.50, 0.95, 0.99])
             rows.append([op, dt, sim, f"{int(count)}", fmt_ms(avg), fmt_ms(p50), fmt_ms(p95), fmt_ms(p99)])
         return rows
 
@@ -139,8 +139,8 @@ else
   fail "GET /v1/jobs/{id} expected 200 and state field (got code=$code, body=$body)"
 fi
 
-# In Feature 1, submit executes inline, so typically DONE/FAILED immediately.
-# If it’s still RUNNING/QUEUED somehow, wait briefly and re-check once.
+# In Feature 1, submit hands the job to a background executor; small jobs are
+# usually DONE/FAILED by now. If it’s still RUNNING/QUEUED, wait briefly and re-check once.
 if [[ "$STATE" == "RUNNING" ]] || [[ "$STATE" == "QUEUED" ]]; then
   info "job state=$STATE; waiting 0.5s then re-checking..."
   sleep 0.5